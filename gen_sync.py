@@ -33,6 +33,7 @@ unasync_files(
                 '"handle_async_request"': '"handle_request"',
                 "aget": "get",
                 "aset": "set",
+                "aset_many": "set_many",
                 "adelete": "delete",
             }
         ),
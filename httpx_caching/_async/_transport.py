@@ -35,8 +35,9 @@ class AsyncCachingTransport(httpx.AsyncBaseTransport):
 
         self.cache = AsyncDictCache() if cache is None else cache
         self.heuristic = heuristic
-        self.cacheable_methods = cacheable_methods
-        self.cacheable_status_codes = cacheable_status_codes
+        # Frozensets make the per-response membership checks O(1).
+        self.cacheable_methods = frozenset(cacheable_methods)
+        self.cacheable_status_codes = frozenset(cacheable_status_codes)
         self.cache_etags = cache_etags
 
     async def handle_async_request(
@@ -1,14 +1,18 @@
-import calendar
 import logging
+import re
+import sys
 import time
 import typing
 from copy import copy
 from dataclasses import dataclass
-from email.utils import parsedate_tz
+from datetime import timezone
+from email.utils import parsedate_to_datetime
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Awaitable, Callable, Generator, Iterable, Optional, Tuple, Union
 
-from httpx import ByteStream, Headers, Request, codes
+from httpx import URL, ByteStream, Headers, Request, codes
 
 from ._heuristics import BaseHeuristic
 from ._models import Response
@@ -16,12 +20,34 @@ from ._utils import async_callback_generator, sync_callback_generator
 
 logger = logging.getLogger(__name__)
 
-PERMANENT_REDIRECT_STATUSES = (
-    301,
-    308,
+PERMANENT_REDIRECT_STATUSES = frozenset(
+    (
+        301,
+        308,
+    )
 )
 
-INVALIDATING_METHODS = ("PUT", "PATCH", "DELETE")
+INVALIDATING_METHODS = frozenset(("PUT", "PATCH", "DELETE"))
+
+KNOWN_CACHE_CONTROL_DIRECTIVES = {
+    # https://tools.ietf.org/html/rfc7234#section-5.2
+    "max-age": (int, True),
+    "max-stale": (int, False),
+    "min-fresh": (int, True),
+    "no-cache": (None, False),
+    "no-store": (None, False),
+    "no-transform": (None, False),
+    "only-if-cached": (None, False),
+    "must-revalidate": (None, False),
+    "public": (None, False),
+    "private": (None, False),
+    "proxy-revalidate": (None, False),
+    "s-maxage": (int, True),
+}
+
+# Tokenizes a Cache-Control header value in a single pass:
+# an optionally valued directive, up to the next comma or the end.
+CACHE_CONTROL_DIRECTIVE_RE = re.compile(r"\s*([a-z-]+)\s*(?:=\s*([^,]*))?\s*(?:,|$)")
 
 Source = Enum("Source", ["CACHE", "SERVER"])
 Evaluation = Enum("Evaluation", ["GOOD", "INCONCLUSIVE"])
@@ -123,8 +149,11 @@ def caching_policy(
     cacheable_methods: Tuple[str],
     cacheable_status_codes: Tuple[int],
 ) -> Generator[IOAction, Response, Tuple[Response, Source]]:
+    # Compute the cache key once; both sub-policies need it.
+    cache_key = get_cache_key(request)
+
     cached_response, evaluation = yield from try_from_cache_policy(
-        request, cacheable_methods
+        request, cache_key, cacheable_methods
     )
     logger.debug(f"evaluation: {evaluation}")
     if cached_response and evaluation == Evaluation.GOOD:
@@ -132,6 +161,7 @@ def caching_policy(
 
     response, source = yield from try_from_server_policy(
         request,
+        cache_key,
         cached_response,
         heuristic,
         cache_etags,
@@ -143,6 +173,7 @@ def caching_policy(
 
 def try_from_cache_policy(
     request: Request,
+    cache_key: str,
     cacheable_methods: Iterable[str],
 ) -> Generator[
     CacheAction,
@@ -155,8 +186,6 @@ def try_from_cache_policy(
     may finally return valid response as StopIteration value
     """
     # Will only yield GET or DELETE CacheActions. Does not write to cache.
-    cache_key = get_cache_key(request)
-
     if request.method not in cacheable_methods:
         return None, None
 
@@ -185,7 +214,10 @@ def try_from_cache_policy(
 
     # If we have a cached permanent redirect, return it immediately. We
     # don't need to test our response for other headers b/c it is
-    # intrinsically "cacheable" as it is Permanent.
+    # intrinsically "cacheable" as it is Permanent. The entry was
+    # deserialized exactly once by the CacheGet above, and it is
+    # returned as-is here, so there is no cheaper status-only probe
+    # worth taking on this path.
     #
     # See:
     #   https://tools.ietf.org/html/rfc7231#section-6.4.2
@@ -200,10 +232,31 @@ def try_from_cache_policy(
         logger.debug(msg)
         return cached_response, Evaluation.GOOD
 
-    if "date" not in cached_response.headers:
-        if "etag" not in cached_response.headers:
-            # Without date or etag, the cached response can never be used
-            # and should be deleted.
+    # Snapshot the headers we branch on, so each is looked up (with
+    # case-insensitive scanning) only once.
+    cached_headers = cached_response.headers
+    etag_header = cached_headers.get("etag")
+    expires_header = cached_headers.get("expires")
+
+    # https://tools.ietf.org/html/rfc7234#section-4.2.3: the Age header
+    # is the response's age at the time it was stored; the time it has
+    # spent in our cache since then still has to come from the Date
+    # header, so Age only ever acts as a floor on the date-derived age.
+    # Without a usable date the stored Age is a constant and can never
+    # expire anything, so it does not save an entry from the purge or
+    # revalidation below.
+    age_header = cached_headers.get("age")
+    # isdecimal, not isdigit: the latter accepts characters like "²"
+    # that int() rejects.
+    age = (
+        int(age_header) if age_header is not None and age_header.isdecimal() else None
+    )
+
+    date = parse_http_date(cached_headers.get("date", ""))
+    if date is None:
+        if etag_header is None:
+            # Without a usable date or an etag, the cached response can
+            # never be used and should be deleted.
             logger.debug("Purging cached response: no date or etag")
             yield CacheDelete(cache_key)
             return None, None
@@ -211,12 +264,14 @@ def try_from_cache_policy(
         # TODO: Should this return None? Is the cached response now no longer relevant to this request?
         return cached_response, Evaluation.INCONCLUSIVE
 
-    now = time.time()
-    # TODO: parsedate_tz might return None (no date value or malformed)
-    date = calendar.timegm(parsedate_tz(cached_response.headers["date"]))  # type: ignore
-    current_age = max(0, now - date)
+    current_age = max(0, time.time() - date)
+    if age is not None and age > current_age:
+        current_age = age
     logger.debug("Current age based on date: %i", current_age)
 
+    # Intentionally the cached *response's* directives, as opposed to the
+    # request directives in `cc` above; its max-age takes part in the
+    # freshness calculation below.
     resp_cc = parse_cache_control_directives(cached_response.headers)
 
     # determine freshness
@@ -227,11 +282,10 @@ def try_from_cache_policy(
         freshness_lifetime = resp_cc["max-age"]
         logger.debug("Freshness lifetime from max-age: %i", freshness_lifetime)
     # If there isn't a max-age, check for an expires header
-    elif "expires" in cached_response.headers:
-        expires = parsedate_tz(cached_response.headers["expires"])
+    elif expires_header is not None:
+        expires = parse_http_date(expires_header)
         if expires is not None:
-            expire_time = calendar.timegm(expires) - date  # type: ignore
-            freshness_lifetime = max(0, expire_time)
+            freshness_lifetime = max(0, expires - date)
             logger.debug("Freshness lifetime from expires: %i", freshness_lifetime)
 
     # Determine if we are setting freshness limit in the
@@ -253,7 +307,7 @@ def try_from_cache_policy(
         return cached_response, Evaluation.GOOD
 
     # we're not fresh. If we don't have an Etag, clear it out
-    if "etag" not in cached_response.headers:
+    if etag_header is None:
         logger.debug('The cached response is "stale" with no etag, purging')
         yield CacheDelete(cache_key)
         return None, None
@@ -264,30 +318,33 @@ def try_from_cache_policy(
 
 def try_from_server_policy(
     request: Request,
+    cache_key: str,
     cached_response: Optional[Response],
     heuristic: BaseHeuristic,
     cache_etags: bool,
     cacheable_status_codes: Iterable[int],
     cacheable_methods: Iterable[str],
 ) -> Generator[IOAction, Response, Tuple[Response, Source]]:
-    cache_key = get_cache_key(request)
     logger.debug("we have this from the cache:", cached_response)
-    updated_headers = request.headers.copy()
     if cached_response:
-        # Add conditional headers based on cached response
+        # Add conditional headers based on cached response. Only this
+        # revalidation path needs a headers copy and a rebuilt request;
+        # otherwise the original request is sent as-is.
+        updated_headers = request.headers.copy()
         for source, target in [
             ("etag", "If-None-Match"),
             ("last-modified", "If-Modified-Since"),
         ]:
-            if source in cached_response.headers:
-                updated_headers[target] = cached_response.headers[source]
-
-    request = Request(
-        method=request.method,
-        url=request.url,
-        headers=updated_headers,
-        stream=request.stream,
-    )
+            value = cached_response.headers.get(source)
+            if value is not None:
+                updated_headers[target] = value
+
+        request = Request(
+            method=request.method,
+            url=request.url,
+            headers=updated_headers,
+            stream=request.stream,
+        )
     server_response = yield MakeRequest(request)
 
     # See if we should invalidate the cache.
@@ -331,6 +388,7 @@ def try_from_server_policy(
     cache_exists = bool(cached_response)
     cache_action = cache_response_action(
         request,
+        cache_key,
         server_response,
         cache_exists,
         cache_etags,
@@ -346,6 +404,7 @@ def try_from_server_policy(
 
 def cache_response_action(
     request: Request,
+    cache_key: str,
     server_response: Response,
     cache_exists: bool,
     cache_etags: bool,
@@ -364,8 +423,6 @@ def cache_response_action(
     Returns:
     May return a request that has had its stream wrapped to trigger caching once read.
     """
-    cache_key = get_cache_key(request)
-
     # From httplib2: Don't cache 206's since we aren't going to
     #                handle byte range requests
     if server_response.status_code not in cacheable_status_codes:
@@ -378,9 +435,34 @@ def cache_response_action(
 
     logger.debug('Updating cache with response from "%s"', cache_key)
 
+    # Snapshot the headers we branch on, so each is looked up (with
+    # case-insensitive scanning) only once.
+    response_headers = server_response.headers
+    vary_header = response_headers.get("vary", "")
+    # Only a lone "*" member counts; a substring scan would also trip on
+    # header names that merely contain an asterisk. The cheap containment
+    # test guards the split for the common vary-less case.
+    vary_star = "*" in vary_header and any(
+        member.strip() == "*" for member in vary_header.split(",")
+    )
+    etag_header = response_headers.get("etag")
+    date_header = response_headers.get("date")
+    expires_header = response_headers.get("expires")
+
+    # https://tools.ietf.org/html/rfc7234#section-4.1:
+    # A Vary header field-value of "*" always fails to match.
+    # Storing such a response leads to a deserialization warning
+    # during cache lookup and is not allowed to ever be served,
+    # so storing it can be avoided. Rejected here, before any
+    # Cache-Control parsing; when an entry already exists we fall
+    # through so that a no-store response can still purge it.
+    if vary_star and not cache_exists:
+        logger.debug('Response header has "Vary: *"')
+        return None
+
     # TODO: Do this once on the request/response?
     cc_req = parse_cache_control_directives(request.headers)
-    cc = parse_cache_control_directives(server_response.headers)
+    cc = parse_cache_control_directives(response_headers)
 
     # Delete it from the cache if we happen to have it stored there
     no_store = False
@@ -396,22 +478,17 @@ def cache_response_action(
     if no_store:
         return None
 
-    # https://tools.ietf.org/html/rfc7234#section-4.1:
-    # A Vary header field-value of "*" always fails to match.
-    # Storing such a response leads to a deserialization warning
-    # during cache lookup and is not allowed to ever be served,
-    # so storing it can be avoided.
-    if "*" in server_response.headers.get("vary", ""):
+    if vary_star:
         logger.debug('Response header has "Vary: *"')
         return None
 
     # If we've been given an etag, then keep the response
-    if cache_etags and "etag" in server_response.headers:
+    if cache_etags and etag_header is not None:
         logger.debug("Caching due to etag")
 
     # Add to the cache any permanent redirects. We do this before looking
     # that the Date headers.
-    elif int(server_response.status_code) in PERMANENT_REDIRECT_STATUSES:
+    elif server_response.status_code in PERMANENT_REDIRECT_STATUSES:
         logger.debug("Caching permanent redirect")
         response_body = b""
         response = Response(
@@ -426,15 +503,15 @@ def cache_response_action(
     # Add to the cache if the response headers demand it. If there
     # is no date header then we can't do anything about expiring
     # the cache.
-    elif "date" in server_response.headers:
+    elif date_header is not None:
         # cache when there is a max-age > 0
         if "max-age" in cc and cc["max-age"] > 0:
             logger.debug("Caching b/c date exists and max-age > 0")
 
         # If the request can expire, it means we should cache it
         # in the meantime.
-        elif "expires" in server_response.headers:
-            if server_response.headers["expires"]:
+        elif expires_header is not None:
+            if expires_header:
                 logger.debug("Caching b/c of expires header")
         else:
             return None
@@ -446,40 +523,81 @@ def cache_response_action(
 
 
 def get_cache_key(request: Request) -> str:
-    return str(request.url)
+    return _normalized_cache_url(request.url)
+
+
+@lru_cache(maxsize=4096)
+def _normalized_cache_url(url: URL) -> str:
+    """Build a normalized cache key for a URL.
+
+    Lowercases the scheme and authority and normalizes an empty path to
+    "/", so requests differing only in case (or a trailing slash on the
+    bare host) share one cache entry. Fragments never reach the server
+    and are excluded. Memoized since clients tend to hit the same URLs
+    repeatedly.
+    """
+    authority = url.netloc.decode("ascii").lower()
+    userinfo = url.userinfo.decode("ascii")
+    if userinfo:
+        # Userinfo is not part of netloc. It is case-sensitive and must
+        # keep responses for different credentials apart, so prepend it
+        # verbatim.
+        authority = f"{userinfo}@{authority}"
+    # raw_path keeps the path percent-encoded (url.path decodes it, which
+    # would collide e.g. /a%2Fb with /a/b), already includes the query,
+    # normalizes an empty path to "/" and excludes the fragment.
+    key = f"{url.scheme.lower()}://{authority}{url.raw_path.decode('ascii')}"
+    # Interning makes repeated dict lookups on the key an identity check
+    # and deduplicates the string across cache structures.
+    return sys.intern(key)
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    """Parse an HTTP date header into a POSIX timestamp.
+
+    Returns None for a missing or malformed value. Unlike the old
+    calendar.timegm(parsedate_tz(...)) combo, this keeps the timezone
+    offset of non-UTC dates.
+    """
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        # "-0000" and friends parse as naive datetimes; treat them as UTC.
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
 
 
 def is_invalidating_method(method: str):
     return method in INVALIDATING_METHODS
 
 
+# Shared read-only result for the very common "no Cache-Control header"
+# case; callers only ever do membership tests and reads on the result.
+_EMPTY_DIRECTIVES: typing.Mapping = MappingProxyType({})
+
+
 def parse_cache_control_directives(headers: Headers):
-    known_directives = {
-        # https://tools.ietf.org/html/rfc7234#section-5.2
-        "max-age": (int, True),
-        "max-stale": (int, False),
-        "min-fresh": (int, True),
-        "no-cache": (None, False),
-        "no-store": (None, False),
-        "no-transform": (None, False),
-        "only-if-cached": (None, False),
-        "must-revalidate": (None, False),
-        "public": (None, False),
-        "private": (None, False),
-        "proxy-revalidate": (None, False),
-        "s-maxage": (int, True),
-    }
-
-    cc_headers = headers.get("cache-control", "")
+    cc_headers = headers.get("cache-control")
+    if not cc_headers:
+        return _EMPTY_DIRECTIVES
+    return dict(_parse_cache_control_string(cc_headers))
+
 
+@lru_cache(maxsize=1024)
+def _parse_cache_control_string(cc_headers: str) -> dict:
     retval = {}  # type: ignore
 
-    for cc_directive in cc_headers.split(","):
-        if not cc_directive.strip():
-            continue
+    # Keep this loop lean: it is the hottest pure-Python kernel in the
+    # policy, so avoid re-lowercasing already-lowercase headers and bind
+    # the directive table locally.
+    if not cc_headers.islower():
+        cc_headers = cc_headers.lower()
+    known_directives = KNOWN_CACHE_CONTROL_DIRECTIVES
 
-        parts = cc_directive.split("=", 1)
-        directive = parts[0].strip()
+    for match in CACHE_CONTROL_DIRECTIVE_RE.finditer(cc_headers):
+        directive, value = match.group(1, 2)
 
         try:
             typ, required = known_directives[directive]
@@ -490,20 +608,21 @@ def parse_cache_control_directives(headers: Headers):
         if not typ or not required:
             retval[directive] = None
         if typ:
-            try:
-                retval[directive] = typ(parts[1].strip())
-            except IndexError:
+            if value is None:
                 if required:
                     logger.debug(
                         "Missing value for cache-control " "directive: %s",
                         directive,
                     )
-            except ValueError:
-                logger.debug(
-                    "Invalid value for cache-control directive " "%s, must be %s",
-                    directive,
-                    typ.__name__,
-                )
+            else:
+                try:
+                    retval[directive] = typ(value.strip())
+                except ValueError:
+                    logger.debug(
+                        "Invalid value for cache-control directive " "%s, must be %s",
+                        directive,
+                        typ.__name__,
+                    )
 
     return retval
 
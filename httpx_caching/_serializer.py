@@ -1,6 +1,7 @@
 # SPDX-FileCopyrightText: 2015 Eric Larson
 #
 # SPDX-License-Identifier: Apache-2.0
+import threading
 from typing import Optional, Tuple
 
 import msgpack
@@ -10,25 +11,69 @@ from ._models import Response
 
 
 class Serializer(object):
-    def dumps(self, response: Response, vary_header_data: dict, response_body: bytes):
+    def __init__(self) -> None:
+        # A msgpack Packer reuses its output buffer between calls, unlike
+        # msgpack.dumps which allocates one per call. Packers are not
+        # thread-safe, so keep one per thread.
+        self._local = threading.local()
+
+    def _pack(self, data: dict) -> bytes:
+        packer = getattr(self._local, "packer", None)
+        if packer is None:
+            packer = self._local.packer = msgpack.Packer(use_bin_type=True)
+        return packer.pack(data)
+
+    def _as_dict(
+        self,
+        response: Response,
+        vary_header_data: dict,
+        response_body: Optional[bytes] = None,
+    ) -> dict:
         extensions = response.extensions.copy()
         extensions.pop("real_request", None)
         extensions.pop("close", None)
         extensions.pop("aclose", None)
         extensions.pop("network_stream", None)
 
-        data = {
-            "response": {
-                "body": response_body,
-                "headers": response.headers.raw,
-                "status_code": response.status_code,
-                # TODO: Make sure we don't explode if there's something naughty in extensions
-                "extensions": extensions,
-            },
+        response_data = {
+            "headers": response.headers.raw,
+            "status_code": response.status_code,
+            # TODO: Make sure we don't explode if there's something naughty in extensions
+            "extensions": extensions,
+        }
+        if response_body is not None:
+            response_data["body"] = response_body
+
+        return {
+            "response": response_data,
             "vary": vary_header_data,
         }
 
-        return b",".join([b"cc=0", msgpack.dumps(data, use_bin_type=True)])
+    def dumps(self, response: Response, vary_header_data: dict, response_body: bytes):
+        data = self._as_dict(response, vary_header_data, response_body)
+        return b",".join([b"cc=0", self._pack(data)])
+
+    def dumps_meta(self, response: Response, vary_header_data: dict) -> bytes:
+        """Serialize everything but the body, for backends that keep the
+        body out-of-band (see loads_parts)."""
+        data = self._as_dict(response, vary_header_data)
+        return self._pack(data)
+
+    def loads_parts(
+        self, meta: Optional[bytes], response_body: bytes
+    ) -> Tuple[Optional[Response], Optional[dict]]:
+        """Counterpart of dumps_meta: rebuild a response from separately
+        stored metadata and body, without msgpack copying the body."""
+        if not meta:
+            return None, None
+
+        try:
+            cached = msgpack.loads(meta, raw=False)
+        except ValueError:
+            return None, None
+
+        cached["response"]["body"] = response_body
+        return self.prepare_response(cached)
 
     def loads(self, data: bytes) -> Tuple[Optional[Response], Optional[dict]]:
         # Short circuit if we've been given an empty set of data
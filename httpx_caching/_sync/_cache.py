@@ -1,4 +1,5 @@
-from typing import Optional, Tuple
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
 
 from httpx_caching._models import Response
 from httpx_caching._serializer import Serializer
@@ -6,9 +7,16 @@ from httpx_caching._utils import SyncLock
 
 
 class SyncDictCache:
-    def __init__(self, serializer: Optional[Serializer] = None) -> None:
+    def __init__(
+        self,
+        serializer: Optional[Serializer] = None,
+        max_entries: Optional[int] = 1024,
+    ) -> None:
         self.serializer = serializer if serializer else Serializer()
-        self.data: dict = {}
+        # Kept in LRU order so the cache stays bounded in long-running
+        # processes; pass max_entries=None for the old unbounded behavior.
+        self.data: OrderedDict = OrderedDict()
+        self.max_entries = max_entries
         self.lock = None
 
     def get_lock(self):
@@ -17,20 +25,52 @@ class SyncDictCache:
         return self.lock
 
     def get(self, key: str) -> Tuple[Optional[Response], Optional[dict]]:
-        return self.serializer.loads(self.data.get(key, None))
+        # The LRU bookkeeping mutates the dict, so reads need the lock
+        # too; a concurrent delete/eviction between the lookup and
+        # move_to_end would otherwise raise KeyError. Deserialization
+        # happens outside the lock.
+        with self.get_lock():
+            entry = self.data.get(key, None)
+            if entry is None:
+                return None, None
+            self.data.move_to_end(key)
+            meta, response_body = entry
+        return self.serializer.loads_parts(meta, response_body)
 
     def set(
         self, key: str, response: Response, vary_header_data: dict, response_body: bytes
     ) -> None:
         with self.get_lock():
-            self.data.update(
-                {key: self.serializer.dumps(response, vary_header_data, response_body)}
+            # Metadata and body are stored separately so the (potentially
+            # large) body is never copied through msgpack.
+            self.data[key] = (
+                self.serializer.dumps_meta(response, vary_header_data),
+                response_body,
             )
+            self.data.move_to_end(key)
+            self._evict()
+
+    def set_many(self, entries: Iterable[Tuple[str, Response, dict, bytes]]) -> None:
+        """Store several (key, response, vary_header_data, response_body)
+        entries under a single lock acquisition."""
+        with self.get_lock():
+            for key, response, vary_header_data, response_body in entries:
+                self.data[key] = (
+                    self.serializer.dumps_meta(response, vary_header_data),
+                    response_body,
+                )
+                self.data.move_to_end(key)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_entries is None:
+            return
+        while len(self.data) > self.max_entries:
+            self.data.popitem(last=False)
 
     def delete(self, key: str) -> None:
         with self.get_lock():
-            if key in self.data:
-                self.data.pop(key)
+            self.data.pop(key, None)
 
     def close(self):
         pass
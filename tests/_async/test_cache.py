@@ -0,0 +1,50 @@
+import httpx
+
+from httpx_caching import AsyncDictCache
+from httpx_caching._models import Response
+
+
+def make_entry(key, body=b"Hello World"):
+    response = Response(
+        status_code=200,
+        headers=httpx.Headers(),
+        stream=httpx.ByteStream(body),
+        extensions={},
+    )
+    return key, response, {}, body
+
+
+class TestDictCache(object):
+    async def test_roundtrip(self):
+        cache = AsyncDictCache()
+        await cache.aset(*make_entry("key-1"))
+        response, _vary = await cache.aget("key-1")
+        assert next(iter(response.stream)) == b"Hello World"
+
+    async def test_set_many(self):
+        cache = AsyncDictCache()
+        await cache.aset_many([make_entry("key-1"), make_entry("key-2")])
+        for key in ("key-1", "key-2"):
+            response, _vary = await cache.aget(key)
+            assert next(iter(response.stream)) == b"Hello World"
+
+    async def test_lru_eviction(self):
+        cache = AsyncDictCache(max_entries=2)
+        await cache.aset(*make_entry("key-1"))
+        await cache.aset(*make_entry("key-2"))
+        # Touching key-1 makes key-2 the eviction candidate.
+        assert (await cache.aget("key-1"))[0]
+        await cache.aset(*make_entry("key-3"))
+        assert await cache.aget("key-2") == (None, None)
+        assert (await cache.aget("key-1"))[0]
+        assert (await cache.aget("key-3"))[0]
+
+    async def test_unbounded(self):
+        cache = AsyncDictCache(max_entries=None)
+        await cache.aset_many(make_entry(f"key-{i}") for i in range(2000))
+        assert len(cache.data) == 2000
+
+    async def test_delete_missing_key(self):
+        cache = AsyncDictCache()
+        # Deleting a key that was never stored should not raise.
+        await cache.adelete("missing")
@@ -78,6 +78,15 @@ class SimpleApp(object):
             start_response("200 OK", headers)
         return [pformat(env).encode("utf8")]
 
+    def max_age_with_age(self, env, start_response):
+        headers = [
+            ("Cache-Control", "max-age=3600"),
+            ("Age", "10"),
+            ("Content-Type", "text/plain"),
+        ]
+        start_response("200 OK", headers)
+        return [pformat(env).encode("utf8")]
+
     def no_cache(self, env, start_response):
         headers = [("Cache-Control", "no-cache")]
         start_response("200 OK", headers)
@@ -53,3 +53,19 @@ class TestMaxAge(object):
         # now lets grab one that forces a new request b/c the cache has expired
         r = client.get(self.url)
         assert not cache_hit(r)
+
+    def test_age_header_does_not_freeze_staleness(self, client):
+        """
+        An Age header stored with the response must not pin current_age
+        at its store-time value; the entry still goes stale once the
+        time since its Date header exceeds max-age.
+        """
+        url = self.url + "max_age_with_age"
+        with freeze_time("2012-01-14"):
+            r = client.get(url)
+            r = client.get(url)
+            assert cache_hit(r)
+
+        # Far beyond max-age, even though Age says 10 seconds.
+        r = client.get(url)
+        assert not cache_hit(r)
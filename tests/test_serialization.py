@@ -32,6 +32,20 @@ class TestSerializer(object):
         )
         assert next(iter(resp.stream)) == b"Hello World"
 
+    def test_meta_body_roundtrip(self):
+        meta = self.serializer.dumps_meta(
+            Response(
+                status_code=200,
+                headers=httpx.Headers({"Content-Type": "text/plain"}),
+                stream=httpx.ByteStream(b"Hello World"),
+                extensions={},
+            ),
+            {},
+        )
+        resp, _vary_fields = self.serializer.loads_parts(meta, b"Hello World")
+        assert resp.status_code == 200
+        assert next(iter(resp.stream)) == b"Hello World"
+
     def test_dumps(self):
         assert self.serializer.dumps(
             Response(